@@ -0,0 +1,99 @@
+# _bfs_numba.py
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    # Numba is optional: without it the kernels below are left undecorated
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+    # Neighbor lists of the most recently searched CSR arrays; the arrays are
+    # kept alive here so the identity check below cannot match a reused id
+    _neighbor_cache = (None, None, None)
+
+    def _bfs_csr_python(indptr, indices, src, dist, queue):
+        """
+        Pure-Python BFS with the same contract as bfs_csr.
+
+        Indexing numpy arrays one scalar at a time is slow in plain Python, so the
+        search runs over per-node Python neighbor lists (built once per CSR) and
+        only the final distances are written back to dist. The queue argument is
+        accepted for compatibility and left unused.
+        """
+        global _neighbor_cache
+        cached_indptr, cached_indices, neighbors = _neighbor_cache
+        if cached_indptr is not indptr or cached_indices is not indices:
+            bounds = indptr.tolist()
+            flat = indices.tolist()
+            neighbors = [flat[bounds[u]:bounds[u + 1]] for u in range(len(bounds) - 1)]
+            _neighbor_cache = (indptr, indices, neighbors)
+
+        distance = [-1] * len(neighbors)
+        distance[src] = 0
+        frontier = [src]
+        # Iterating a list while appending to it visits the appended nodes too,
+        # so the list doubles as the BFS queue
+        for u in frontier:
+            next_distance = distance[u] + 1
+            for v in neighbors[u]:
+                if distance[v] == -1:
+                    distance[v] = next_distance
+                    frontier.append(v)
+        dist[:] = distance
+
+
+@njit(cache=True)
+def bfs_csr(indptr, indices, src, dist, queue):
+    """
+    Breadth-first search over a CSR adjacency structure.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers of length num_nodes + 1.
+        indices (np.ndarray): CSR neighbor indices.
+        src (int): Index of the source node.
+        dist (np.ndarray): Output array of length num_nodes; filled with hop
+            distances from src, or -1 for unreachable nodes.
+        queue (np.ndarray): Scratch int32 array of length at least num_nodes.
+    """
+    dist[:] = -1
+    dist[src] = 0
+    queue[0] = src
+    head = 0
+    tail = 1
+    while head < tail:
+        u = queue[head]
+        head += 1
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            if dist[v] == -1:
+                dist[v] = dist[u] + 1
+                queue[tail] = v
+                tail += 1
+
+
+if not NUMBA_AVAILABLE:
+    bfs_csr = _bfs_csr_python
+
+
+@njit(parallel=True, cache=True)
+def multi_bfs(indptr, indices, sources, dist_out, queues):
+    """
+    Runs independent BFS searches from several sources in parallel.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers of length num_nodes + 1.
+        indices (np.ndarray): CSR neighbor indices.
+        sources (np.ndarray): Indices of the source nodes.
+        dist_out (np.ndarray): Output array of shape [len(sources), num_nodes]; row i
+            receives the hop distances from sources[i], or -1 for unreachable nodes.
+        queues (np.ndarray): Scratch int32 array of shape [len(sources), num_nodes].
+    """
+    for i in prange(len(sources)):
+        bfs_csr(indptr, indices, sources[i], dist_out[i], queues[i])
@@ -1,15 +1,87 @@
 # feature_extraction.py
 
 import json
-from collections import defaultdict, deque
 import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+from featureExtraction._bfs_numba import bfs_csr, multi_bfs
+
+# Column order of the node features matrix
+FEATURE_NAMES = ['CPU Resources', 'Adjacent Bandwidth', 'Distance Correlation', 'Time Correlation', 'Security']
+
+# Maximum number of mapped-node sets whose features are cached per physical network
+FEATURE_CACHE_SIZE = 256
+
+@dataclass(eq=False)
+class PhysicalNet:
+    """
+    Physical network data together with link arrays parsed once at load time.
+
+    Links and node security levels are treated as fixed once loaded; CPU capacities
+    may change. Instances compare by identity.
+
+    Attributes:
+        nodes (List[dict]): List of physical node dictionaries.
+        links (List[dict]): List of physical link dictionaries.
+        src_idx (np.ndarray): Source node index of each link.
+        tgt_idx (np.ndarray): Target node index of each link.
+        bw (np.ndarray): Bandwidth of each link.
+        delay (np.ndarray): Delay of each link.
+        feature_cache (OrderedDict): LRU cache of CPU-independent feature matrices,
+            keyed by the sorted mapped nodes; kept on the network so it is freed with it.
+    """
+    nodes: List[dict]
+    links: List[dict]
+    src_idx: np.ndarray
+    tgt_idx: np.ndarray
+    bw: np.ndarray
+    delay: np.ndarray
+    feature_cache: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False)
 
 class FeatureExtractor:
     def __init__(self):
         """
         Initializes the FeatureExtractor.
         """
-        pass  # No initialization needed since we're not using scalers or complex structures
+        # Compile the BFS kernels up front on a tiny two-node graph so the first
+        # real feature extraction is not dominated by JIT compilation
+        indptr = np.array([0, 1, 2], dtype=np.int32)
+        indices = np.array([1, 0], dtype=np.int32)
+        bfs_csr(indptr, indices, 0, np.empty(2, dtype=np.int32), np.empty(2, dtype=np.int32))
+        multi_bfs(indptr, indices, np.array([0, 1], dtype=np.int64),
+                  np.empty((2, 2), dtype=np.int32), np.empty((2, 2), dtype=np.int32))
+
+        # Scratch buffers of shape [rows, N] reused across calls, one row per BFS
+        # source; sized lazily once the node count is known
+        self._scratch_N = 0
+        self._scratch_rows = 0
+        self._bfs_dist = None
+        self._bfs_queue = None
+
+        # CSR adjacency of the most recent physical network; topology never changes
+        # after loading, so CPU updates do not invalidate it
+        self._csr = None
+        self._csr_net = None
+
+    def _ensure_scratch(self, N, rows=1):
+        """
+        Sizes the scratch buffers for N nodes and at least the given number of rows.
+
+        The node dimension is kept exact so that row slices stay C-contiguous.
+
+        Args:
+            N (int): Number of physical nodes.
+            rows (int, optional): Number of simultaneous BFS searches. Defaults to 1.
+        """
+        if N != self._scratch_N or rows > self._scratch_rows:
+            self._bfs_dist = np.empty((rows, N), dtype=np.int32)
+            self._bfs_queue = np.empty((rows, N), dtype=np.int32)
+            self._scratch_N = N
+            self._scratch_rows = rows
 
     def load_physical_data(self, filepath):
         """
@@ -19,7 +91,7 @@ class FeatureExtractor:
             filepath (str): Path to the physical_network.json file.
 
         Returns:
-            Tuple[List[dict], List[dict]]: Lists of physical nodes and physical links.
+            PhysicalNet: Physical nodes and links with parsed link arrays.
         """
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"The file {filepath} does not exist.")
@@ -28,172 +100,252 @@ class FeatureExtractor:
             physical_data = json.load(f)
             physical_nodes = physical_data['NP']
             physical_links = physical_data['LP']
-        return physical_nodes, physical_links
+        return self.build_physical_net(physical_nodes, physical_links)
 
-    def build_adjacency_list(self, physical_links):
+    def build_physical_net(self, physical_nodes, physical_links):
         """
-        Constructs an adjacency list from physical links.
+        Builds a PhysicalNet, parsing the links into endpoint, bandwidth and delay arrays.
 
         Args:
+            physical_nodes (List[dict]): List of physical node dictionaries.
             physical_links (List[dict]): List of physical link dictionaries.
 
         Returns:
-            defaultdict: Adjacency list representation of the network.
+            PhysicalNet: Physical nodes and links with parsed link arrays.
+        """
+        num_links = len(physical_links)
+        # Node ids all share the fixed 'node_' prefix
+        src_idx = np.fromiter((int(link['source'][5:]) for link in physical_links), dtype=np.int32, count=num_links)
+        tgt_idx = np.fromiter((int(link['target'][5:]) for link in physical_links), dtype=np.int32, count=num_links)
+        bw = np.fromiter((link['bandwidth'] for link in physical_links), dtype=np.int64, count=num_links)
+        delay = np.fromiter((link['delay'] for link in physical_links), dtype=np.float64, count=num_links)
+        return PhysicalNet(physical_nodes, physical_links, src_idx, tgt_idx, bw, delay)
+
+    def build_adjacency_list(self, physical_net):
+        """
+        Constructs a CSR adjacency structure from physical links.
+
+        The result is cached, so it is built once per physical network.
+
+        Args:
+            physical_net (PhysicalNet): Physical network data.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: CSR row pointers (indptr) and neighbor indices.
         """
-        adjacency = defaultdict(list)
-        for link in physical_links:
-            source = int(link['source'].split('_')[1])
-            target = int(link['target'].split('_')[1])
-            adjacency[source].append(target)
-            adjacency[target].append(source)
-        return adjacency
+        if self._csr is not None and self._csr_net is physical_net:
+            return self._csr
 
-    def get_node_computing_resources(self, physical_nodes):
+        num_nodes = len(physical_net.nodes)
+        sources, targets = physical_net.src_idx, physical_net.tgt_idx
+        # Every undirected link appears once in each endpoint's row
+        heads = np.concatenate([sources, targets])
+        tails = np.concatenate([targets, sources])
+        order = np.argsort(heads, kind='stable')
+        indices = tails[order]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(heads, minlength=num_nodes), out=indptr[1:])
+        self._csr = (indptr, indices)
+        self._csr_net = physical_net
+        return self._csr
+
+    def get_node_computing_resources(self, physical_net):
         """
         Extracts CPU capacities from physical nodes.
 
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
+            physical_net (PhysicalNet): Physical network data.
 
         Returns:
             List[float]: List of CPU capacities.
         """
-        return [node['cpu_capacity'] for node in physical_nodes]
+        return [node['cpu_capacity'] for node in physical_net.nodes]
 
-    def get_adjacent_link_bandwidth(self, physical_nodes, physical_links):
+    def get_adjacent_link_bandwidth(self, physical_net):
         """
         Calculates the total adjacent link bandwidth for each node.
 
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
-            physical_links (List[dict]): List of physical link dictionaries.
+            physical_net (PhysicalNet): Physical network data.
 
         Returns:
-            List[int]: List of total adjacent link bandwidths.
+            np.ndarray: Array of total adjacent link bandwidths.
         """
-        num_nodes = len(physical_nodes)
-        adj_bandwidth = [0 for _ in range(num_nodes)]
-        for link in physical_links:
-            source = int(link['source'].split('_')[1])
-            target = int(link['target'].split('_')[1])
-            bandwidth = link['bandwidth']
-            adj_bandwidth[source] += bandwidth
-            adj_bandwidth[target] += bandwidth
-        return adj_bandwidth
+        num_nodes = len(physical_net.nodes)
+        adj_bandwidth = (np.bincount(physical_net.src_idx, weights=physical_net.bw, minlength=num_nodes)
+                         + np.bincount(physical_net.tgt_idx, weights=physical_net.bw, minlength=num_nodes))
+        return adj_bandwidth.astype(np.int64)
 
-    def get_distance_correlation(self, physical_nodes, adjacency, mapped_nodes):
+    def get_distance_correlation(self, physical_net, adjacency, mapped_nodes):
         """
         Computes the average distance from each node to all mapped nodes.
 
+        Hop distances are symmetric, so a BFS from each mapped node (rather than
+        from every physical node) yields all the distances that are averaged.
+
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
-            adjacency (defaultdict): Adjacency list of the network.
+            physical_net (PhysicalNet): Physical network data.
+            adjacency (Tuple[np.ndarray, np.ndarray]): CSR adjacency (indptr, indices) of the network.
             mapped_nodes (List[int]): List of currently mapped node indices.
 
         Returns:
-            List[float]: List of average distances to mapped nodes.
-        """
-        num_nodes = len(physical_nodes)
-        distance_corr = []
-        for k in range(num_nodes):
-            # BFS to find shortest paths from node k
-            visited = [False] * num_nodes
-            distance = [0] * num_nodes
-            queue = deque()
-            queue.append(k)
-            visited[k] = True
-            while queue:
-                current = queue.popleft()
-                for neighbor in adjacency[current]:
-                    if not visited[neighbor]:
-                        visited[neighbor] = True
-                        distance[neighbor] = distance[current] + 1
-                        queue.append(neighbor)
-            # Extract distances to mapped nodes
-            mapped_distances = [distance[mapped_node] for mapped_node in mapped_nodes if mapped_node != k]
-            if mapped_distances:
-                avg_distance = sum(mapped_distances) / len(mapped_distances)
-            else:
-                avg_distance = 0.0  # No mapped nodes
-            distance_corr.append(avg_distance)
-        return distance_corr
-
-    def get_time_correlation(self, physical_nodes, physical_links):
+            np.ndarray: Array of average distances to mapped nodes.
+        """
+        num_nodes = len(physical_net.nodes)
+        if not mapped_nodes:
+            return np.zeros(num_nodes)  # No mapped nodes
+
+        indptr, indices = adjacency
+        # The BFS from each mapped node is independent, so run them in parallel,
+        # each writing its own row
+        sources = np.asarray(mapped_nodes, dtype=np.int64)
+        self._ensure_scratch(num_nodes, len(sources))
+        distances = self._bfs_dist[:len(sources)]
+        multi_bfs(indptr, indices, sources, distances, self._bfs_queue[:len(sources)])
+        # Unreachable nodes contribute a distance of 0
+        np.maximum(distances, 0, out=distances)
+        totals = distances.sum(axis=0)
+
+        # A mapped node does not count its own (zero) distance in its average
+        counts = len(mapped_nodes) - np.bincount(mapped_nodes, minlength=num_nodes)
+        return np.divide(totals, counts, out=np.zeros(num_nodes), where=counts > 0)
+
+    def update_distance_corr(self, dist_corr, new_mapped_node, csr, running_count):
+        """
+        Incrementally updates the distance correlation after mapping a node.
+
+        Runs a single BFS from the newly mapped node and folds its distances into
+        the running averages, instead of recomputing them for all mapped nodes.
+
+        Args:
+            dist_corr (np.ndarray): Current average distances to mapped nodes, updated in place.
+            new_mapped_node (int): Index of the newly mapped physical node.
+            csr (Tuple[np.ndarray, np.ndarray]): CSR adjacency (indptr, indices) of the network.
+            running_count (np.ndarray): Number of mapped nodes averaged into each entry
+                of dist_corr, updated in place.
+
+        Returns:
+            np.ndarray: The updated dist_corr array.
+        """
+        indptr, indices = csr
+        num_nodes = len(dist_corr)
+        self._ensure_scratch(num_nodes)
+        new_dist = self._bfs_dist[0]
+        bfs_csr(indptr, indices, new_mapped_node, new_dist, self._bfs_queue[0])
+        # Unreachable nodes contribute a distance of 0
+        np.maximum(new_dist, 0, out=new_dist)
+
+        total = dist_corr * running_count + new_dist
+        # The newly mapped node does not count its own distance
+        running_count += 1
+        running_count[new_mapped_node] -= 1
+        dist_corr[:] = np.divide(total, running_count, out=np.zeros(num_nodes), where=running_count > 0)
+        return dist_corr
+
+    def update_physical_cpu(self, physical_net, idx, delta):
+        """
+        Adjusts the CPU capacity of a physical node, clamping it at zero.
+
+        Args:
+            physical_net (PhysicalNet): Physical network data.
+            idx (int): Index of the physical node.
+            delta (float): Change in CPU capacity (negative to consume resources).
+
+        Returns:
+            float: The node's new CPU capacity.
+        """
+        node = physical_net.nodes[idx]
+        node['cpu_capacity'] = max(node['cpu_capacity'] + delta, 0)  # Prevent negative capacity
+        return node['cpu_capacity']
+
+    def get_time_correlation(self, physical_net):
         """
         Computes the average delay from each node to all other nodes.
 
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
-            physical_links (List[dict]): List of physical link dictionaries.
+            physical_net (PhysicalNet): Physical network data.
 
         Returns:
-            List[float]: List of average delays.
-        """
-        num_nodes = len(physical_nodes)
-        total_delay = [0 for _ in range(num_nodes)]
-        link_count = [0 for _ in range(num_nodes)]
-        for link in physical_links:
-            source = int(link['source'].split('_')[1])
-            target = int(link['target'].split('_')[1])
-            delay = link['delay']
-            total_delay[source] += delay
-            total_delay[target] += delay
-            link_count[source] += 1
-            link_count[target] += 1
-        avg_delay = []
-        for i in range(num_nodes):
-            if link_count[i] > 0:
-                avg = total_delay[i] / link_count[i]
-            else:
-                avg = 0.0
-            avg_delay.append(avg)
+            np.ndarray: Array of average delays.
+        """
+        num_nodes = len(physical_net.nodes)
+        src_idx, tgt_idx, delay = physical_net.src_idx, physical_net.tgt_idx, physical_net.delay
+        total_delay = (np.bincount(src_idx, weights=delay, minlength=num_nodes)
+                       + np.bincount(tgt_idx, weights=delay, minlength=num_nodes))
+        link_count = np.bincount(np.concatenate([src_idx, tgt_idx]), minlength=num_nodes)
+        avg_delay = np.divide(total_delay, link_count, out=np.zeros(num_nodes), where=link_count > 0)
         return avg_delay
 
-    def get_node_security(self, physical_nodes):
+    def get_node_security(self, physical_net):
         """
         Extracts security levels from physical nodes.
 
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
+            physical_net (PhysicalNet): Physical network data.
 
         Returns:
             List[int]: List of security levels.
         """
-        return [node['security_level'] for node in physical_nodes]
+        return [node['security_level'] for node in physical_net.nodes]
 
-    def get_node_features_matrix(self, physical_nodes, physical_links, mapped_nodes):
+    def get_node_features_matrix(self, physical_net, mapped_nodes):
         """
         Extracts and constructs the node features matrix.
 
+        Columns that depend only on the topology, node security and mapped nodes are
+        cached on physical_net; the CPU column is always read from physical_net.nodes,
+        so capacity changes are picked up however they are made.
+
         Args:
-            physical_nodes (List[dict]): List of physical node dictionaries.
-            physical_links (List[dict]): List of physical link dictionaries.
+            physical_net (PhysicalNet): Physical network data.
             mapped_nodes (List[int]): List of currently mapped node indices.
 
         Returns:
-            List[dict]: List of node feature dictionaries.
+            Tuple[List[str], np.ndarray]: Node identifiers and a float32 feature matrix of
+            shape [num_nodes, num_features], with columns ordered as FEATURE_NAMES.
+        """
+        # The cached columns depend only on which nodes are mapped, not their order
+        key = tuple(sorted(mapped_nodes))
+        cache = physical_net.feature_cache
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = self._compute_features(physical_net, key)
+            if len(cache) > FEATURE_CACHE_SIZE:
+                cache.popitem(last=False)
+        ids, cached = cache[key]
+        # Callers update the matrix in place, so never hand out the cached copy
+        features = cached.copy()
+        features[:, 0] = self.get_node_computing_resources(physical_net)
+        return list(ids), features
+
+    def _compute_features(self, physical_net, mapped_nodes):
+        """
+        Computes the CPU-independent node features; memoised in physical_net.feature_cache.
+
+        Args:
+            physical_net (PhysicalNet): Physical network data.
+            mapped_nodes (Tuple[int, ...]): Currently mapped node indices.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: Node identifiers and the float32 feature matrix,
+            with the CPU column left unset.
         """
         # Extract Features
-        cpu_resources = self.get_node_computing_resources(physical_nodes)  # [num_nodes]
-        adj_bandwidth = self.get_adjacent_link_bandwidth(physical_nodes, physical_links)  # [num_nodes]
-        security = self.get_node_security(physical_nodes)  # [num_nodes]
-
-        adjacency = self.build_adjacency_list(physical_links)
-        distance_corr = self.get_distance_correlation(physical_nodes, adjacency, mapped_nodes)  # [num_nodes]
-        time_corr = self.get_time_correlation(physical_nodes, physical_links)  # [num_nodes]
-
-        # Combine all features into a list of dictionaries
-        node_features = []
-        feature_names = ['CPU Resources', 'Adjacent Bandwidth', 'Distance Correlation', 'Time Correlation', 'Security']
-        for idx in range(len(physical_nodes)):
-            feature = {
-                'Node': f'node_{idx}',
-                'CPU Resources': cpu_resources[idx],
-                'Adjacent Bandwidth': adj_bandwidth[idx],
-                'Distance Correlation': distance_corr[idx],
-                'Time Correlation': time_corr[idx],
-                'Security': security[idx]
-            }
-            node_features.append(feature)
-
-        return node_features
+        adj_bandwidth = self.get_adjacent_link_bandwidth(physical_net)  # [num_nodes]
+        security = self.get_node_security(physical_net)  # [num_nodes]
+
+        adjacency = self.build_adjacency_list(physical_net)
+        distance_corr = self.get_distance_correlation(physical_net, adjacency, mapped_nodes)  # [num_nodes]
+        time_corr = self.get_time_correlation(physical_net)  # [num_nodes]
+
+        # Combine all features column-wise into a single matrix
+        num_nodes = len(physical_net.nodes)
+        ids = [f'node_{idx}' for idx in range(num_nodes)]
+        features = np.empty((num_nodes, len(FEATURE_NAMES)), dtype=np.float32)
+        features[:, 1] = adj_bandwidth
+        features[:, 2] = distance_corr
+        features[:, 3] = time_corr
+        features[:, 4] = security
+
+        return ids, features
@@ -1,33 +1,48 @@
-import random
 import numpy as np
 import json
 
 def generate_physical_network(num_nodes=100, num_links=550):
+    rng = np.random.default_rng()
+
     # Generate nodes
-    physical_nodes = []
-    for i in range(num_nodes):
-        node = {
+    cpu_capacities = rng.integers(50, 81, num_nodes)     # U(50,80)
+    security_levels = rng.integers(1, 4, num_nodes)     # U(1,3)
+    physical_nodes = [
+        {
             "id": f"node_{i}",
-            "cpu_capacity": random.randint(50, 80),  # U(50,80)
-            "security_level": random.randint(1, 3)   # U(1,3)
+            "cpu_capacity": cpu,
+            "security_level": security
         }
-        physical_nodes.append(node)
+        for i, (cpu, security) in enumerate(zip(cpu_capacities.tolist(), security_levels.tolist()))
+    ]
 
     # Generate links
-    physical_links = []
-    edges = set()
-    while len(physical_links) < num_links:
-        source = random.randint(0, num_nodes - 1)
-        target = random.randint(0, num_nodes - 1)
-        if source != target and (source, target) not in edges and (target, source) not in edges:
-            link = {
-                "source": f"node_{source}",
-                "target": f"node_{target}",
-                "bandwidth": random.randint(50, 80),  # U(50,80)
-                "delay": random.randint(1, 50)        # U(1,50)
-            }
-            physical_links.append(link)
-            edges.add((source, target))
+    if num_links > num_nodes * (num_nodes - 1) // 2:
+        raise ValueError(f"Cannot place {num_links} distinct links between {num_nodes} nodes.")
+    edge_keys = np.empty(0, dtype=np.int64)
+    while len(edge_keys) < num_links:
+        # Draw candidate edges in bulk and drop self-loops
+        candidates = rng.integers(0, num_nodes, size=(int(num_links * 1.3), 2))
+        candidates.sort(axis=1)
+        candidates = candidates[candidates[:, 0] != candidates[:, 1]]
+        edge_keys = np.concatenate([edge_keys, candidates[:, 0] * num_nodes + candidates[:, 1]])
+        # Drop duplicate edges, keeping the draw order so no node range is favoured
+        _, first_index = np.unique(edge_keys, return_index=True)
+        edge_keys = edge_keys[np.sort(first_index)]
+    sources, targets = np.divmod(edge_keys[:num_links], num_nodes)
+    bandwidths = rng.integers(50, 81, num_links)  # U(50,80)
+    delays = rng.integers(1, 51, num_links)       # U(1,50)
+    physical_links = [
+        {
+            "source": f"node_{source}",
+            "target": f"node_{target}",
+            "bandwidth": bandwidth,
+            "delay": delay
+        }
+        for source, target, bandwidth, delay in zip(
+            sources.tolist(), targets.tolist(), bandwidths.tolist(), delays.tolist()
+        )
+    ]
 
     physical_network = {
         "NP": physical_nodes,
@@ -39,7 +54,8 @@ def generate_physical_network(num_nodes=100, num_links=550):
         json.dump(physical_network, f)
 
 
-# Generate physical network
-generate_physical_network()
+if __name__ == "__main__":
+    # Generate physical network
+    generate_physical_network()
 
 
@@ -1,35 +1,46 @@
-import random
 import numpy as np
 import json
+from itertools import chain
 
-def generate_vnrs(num_vnrs=1000):
-    vnrs = []
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(record):
+        return json.dumps(record).encode('utf-8')
+
+def generate_vnrs_iter(num_vnrs=1000, seed=None):
+    # A single generator shared by all VNRs keeps runs reproducible for a given seed
+    rng = np.random.default_rng(seed)
     for idx in range(num_vnrs):
-        num_nodes = random.randint(2, 10)  # U(2,10)
-        virtual_nodes = []
-        for i in range(num_nodes):
-            node = {
+        num_nodes = int(rng.integers(2, 11))  # U(2,10)
+        cpu_reqs = rng.integers(1, 31, num_nodes)     # U(1,30)
+        safety_reqs = rng.integers(1, 4, num_nodes)   # U(1,3)
+        virtual_nodes = [
+            {
                 "node": f"Virtual_Node_{i+1}",
-                "cpu_req": random.randint(1, 30),       # U(1,30)
-                "safety_req": random.randint(1, 3)      # U(1,3)
+                "cpu_req": cpu_req,
+                "safety_req": safety_req
+            }
+            for i, (cpu_req, safety_req) in enumerate(zip(cpu_reqs.tolist(), safety_reqs.tolist()))
+        ]
+
+        # 50% connection probability for each unordered pair of virtual nodes
+        pairs = np.argwhere(np.triu(rng.random((num_nodes, num_nodes)) < 0.5, k=1))
+        bandwidth_reqs = rng.integers(1, 31, len(pairs))  # U(1,30)
+        delay_reqs = rng.integers(1, 21, len(pairs))      # U(1,20)
+        virtual_links = [
+            {
+                "node1": f"Virtual_Node_{i+1}",
+                "node2": f"Virtual_Node_{j+1}",
+                "bandwidth_req": bandwidth_req,
+                "delay_req": delay_req
             }
-            virtual_nodes.append(node)
-
-
-        virtual_links = []
-        for i in range(num_nodes):
-            for j in range(i+1, num_nodes):
-                if random.random() < 0.5:  # 50% connection probability
-                    link = {
-                        "node1": f"Virtual_Node_{i+1}",
-                        "node2": f"Virtual_Node_{j+1}",
-                        "bandwidth_req": random.randint(1, 30),  # U(1,30)
-                        "delay_req": random.randint(1, 20)       # U(1,20)
-                    }
-                    virtual_links.append(link)
-
-        arrival_time = np.random.poisson(lam=5)
-        duration = np.random.exponential(scale=10)
+            for (i, j), bandwidth_req, delay_req in zip(pairs.tolist(), bandwidth_reqs.tolist(), delay_reqs.tolist())
+        ]
+
+        arrival_time = int(rng.poisson(lam=5))
+        duration = float(rng.exponential(scale=10))
         departure_time = arrival_time + duration
 
         vnr = {
@@ -39,16 +50,31 @@ def generate_vnrs(num_vnrs=1000):
             "virtual_nodes": virtual_nodes,
             "virtual_links": virtual_links
         }
-        vnrs.append(vnr)
-    return vnrs
+        yield vnr
+
+def generate_vnrs(num_vnrs=1000, seed=None):
+    return list(generate_vnrs_iter(num_vnrs, seed))
 
-# Generate training and testing VNRs
-training_vnrs = generate_vnrs(1000) 
-testing_vnrs = generate_vnrs(1000)   
+def write_vnrs_jsonl(filepath, vnrs):
+    # Stream one VNR per line so the full list never has to be held or serialised at once
+    with open(filepath, 'wb') as f:
+        for vnr in vnrs:
+            f.write(_dumps(vnr))
+            f.write(b'\n')
 
-# Save VNRs to JSON files
-with open('training_vnrs.json', 'w') as f:
-    json.dump(training_vnrs, f)
+def load_vnrs(filepath):
+    # Read VNRs back one line at a time from JSONL, or from a single JSON array
+    # such as the older data/training_vnrs.json and data/testing_vnrs.json
+    with open(filepath, 'rb') as f:
+        first_line = f.readline()
+        if first_line.lstrip().startswith(b'['):
+            yield from json.loads(first_line + f.read())
+            return
+        for line in chain([first_line], f):
+            if line.strip():
+                yield json.loads(line)
 
-with open('testing_vnrs.json', 'w') as f:
-    json.dump(testing_vnrs, f)
\ No newline at end of file
+if __name__ == "__main__":
+    # Generate training and testing VNRs
+    write_vnrs_jsonl('training_vnrs.jsonl', generate_vnrs_iter(1000))
+    write_vnrs_jsonl('testing_vnrs.jsonl', generate_vnrs_iter(1000))
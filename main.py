@@ -1,14 +1,19 @@
 # main.py
 
 from featureExtraction.node_feature_ext import FeatureExtractor
-from node_policy_net import PolicyNetwork, map_virtual_node
+from node_policy_net import PolicyNetwork, map_virtual_node, score_physical_nodes
+import logging
+import numpy as np
 import torch
 
-def main():
+logger = logging.getLogger(__name__)
+
+def main(compile_policy=False):
     # Initialize FeatureExtractor and load data
     extractor = FeatureExtractor()
     physical_network_file = r'C:\Users\iamad\Documents\GitHub\RlSmartGrid\data\physical_network.json'  # Ensure this file exists in the project directory
-    physical_nodes, physical_links = extractor.load_physical_data(physical_network_file)
+    physical_net = extractor.load_physical_data(physical_network_file)
+    physical_nodes = physical_net.nodes
 
     # Define the virtual network request (as provided by the user)
     virtual_network_request = {
@@ -43,16 +48,30 @@ def main():
     # In practice, you should train the policy network using reinforcement learning
     policy_net.eval()  # Set to evaluation mode
 
-    # Extract node features
+    # Extract node features once; later mappings update them incrementally
     mapped_nodes = []  # Initially, no nodes are mapped
-    node_features = extractor.get_node_features_matrix(
-        physical_nodes, physical_links, mapped_nodes
-    )
+    adjacency = extractor.build_adjacency_list(physical_net)
+    node_ids, node_features = extractor.get_node_features_matrix(physical_net, mapped_nodes)
+    distance_corr = node_features[:, 2]  # View onto the 'Distance Correlation' column
+    distance_count = np.zeros(len(physical_nodes), dtype=np.int64)  # Mapped nodes averaged per node
 
     # Remove or comment out the following block to stop printing physical network features
     # print("\nRaw Node Features:")
-    # for feature in node_features:
-    #     print(feature)
+    # for node_id, feature in zip(node_ids, node_features):
+    #     print(node_id, feature)
+
+    # Optionally specialise the policy network for this run's fixed input shape.
+    # Off by default: for this small network on CPU, compilation costs seconds
+    # and the compiled forward pass is slower than the eager one.
+    if compile_policy:
+        from torch._dynamo.exc import BackendCompilerFailed
+        try:
+            compiled_net = torch.compile(policy_net, mode='reduce-overhead', dynamic=False, fullgraph=True)
+            score_physical_nodes(np.zeros_like(node_features)[None], compiled_net)
+        except BackendCompilerFailed as e:
+            logger.warning("torch.compile failed, running the policy network eagerly: %s", e)
+        else:
+            policy_net = compiled_net
 
     # Process each virtual node in the virtual network request
     for v_node in virtual_network_request['virtual_nodes']:
@@ -60,10 +79,10 @@ def main():
         v_cpu_req = v_node['cpu_req']
         v_safety_req = v_node['safety_req']  # Currently unused in mapping
 
-        print(f"\nMapping {v_node_name} with CPU requirement {v_cpu_req} and Safety requirement {v_safety_req}.")
+        logger.debug("Mapping %s with CPU requirement %s and Safety requirement %s.", v_node_name, v_cpu_req, v_safety_req)
 
         try:
-            # Perform mapping
+            # Perform mapping on the live features
             probabilities, selected_node_idx = map_virtual_node(node_features, policy_net, v_cpu_req)
             selected_node = physical_nodes[selected_node_idx]
 
@@ -73,21 +92,20 @@ def main():
                 "mapped_physical_node": selected_node['id']
             })
 
-            print(f"Selected Physical Node: {selected_node['id']}")
+            logger.debug("Selected Physical Node: %s", selected_node['id'])
 
             # Update the physical node's CPU capacity
-            physical_nodes[selected_node_idx]['cpu_capacity'] -= v_cpu_req
-            if physical_nodes[selected_node_idx]['cpu_capacity'] < 0:
-                physical_nodes[selected_node_idx]['cpu_capacity'] = 0  # Prevent negative capacity
+            new_cpu = extractor.update_physical_cpu(physical_net, selected_node_idx, -v_cpu_req)
 
             # Update node_features to reflect the reduced CPU capacity
-            node_features[selected_node_idx]['CPU Resources'] = physical_nodes[selected_node_idx]['cpu_capacity']
+            node_features[selected_node_idx, 0] = new_cpu
 
-            # Add the node to mapped_nodes if needed for distance correlation
+            # Add the node to mapped_nodes and fold it into the distance correlation
             mapped_nodes.append(selected_node_idx)
+            extractor.update_distance_corr(distance_corr, selected_node_idx, adjacency, distance_count)
 
         except ValueError as e:
-            print(f"Failed to map {v_node_name}: {e}")
+            logger.warning("Failed to map %s: %s", v_node_name, e)
 
     # Display the final mapping results
     print("\nFinal Mapping Results:")
@@ -106,4 +124,5 @@ def main():
         print("\nAll virtual nodes have been successfully mapped.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
     main()
@@ -1,9 +1,12 @@
 # node_mapping.py
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-import random
+
+# Default random generator used to sample physical nodes
+_rng = np.random.default_rng()
 
 class PolicyNetwork(nn.Module):
     def __init__(self, input_size, conv_out_channels=16, conv_kernel_size=1):
@@ -12,99 +15,112 @@ class PolicyNetwork(nn.Module):
 
         Args:
             input_size (int): Number of input features per node.
-            conv_out_channels (int, optional): Number of output channels for convolution. Defaults to 16.
-            conv_kernel_size (int, optional): Kernel size for convolution. Defaults to 1.
+            conv_out_channels (int, optional): Number of hidden units per node. Defaults to 16.
+            conv_kernel_size (int, optional): Kept for compatibility; only 1 is supported,
+                since each node is scored independently. Defaults to 1.
         """
+        if conv_kernel_size != 1:
+            raise ValueError(f"conv_kernel_size must be 1, got {conv_kernel_size}.")
         super(PolicyNetwork, self).__init__()
-        # Convolution layer: 1D convolution over node features
-        self.conv1 = nn.Conv1d(in_channels=input_size, out_channels=conv_out_channels, kernel_size=conv_kernel_size)
-        # Fully connected layer to compute scores
-        self.fc = nn.Linear(conv_out_channels, 1)
+        # Per-node MLP: equivalent to the former kernel-size-1 Conv1d followed by
+        # a fully connected scoring layer, without the permute/reshape round-trip
+        self.mlp = nn.Sequential(
+            nn.Linear(input_size, conv_out_channels),
+            nn.ReLU(inplace=True),
+            nn.Linear(conv_out_channels, 1)
+        )
+        self.register_load_state_dict_pre_hook(self._upgrade_conv_state_dict)
+
+    @staticmethod
+    def _upgrade_conv_state_dict(module, state_dict, prefix, *args):
+        """
+        Renames conv1/fc weights from older checkpoints to the fused MLP layout.
+        """
+        for old_name, new_name in (('conv1', 'mlp.0'), ('fc', 'mlp.2')):
+            for param in ('weight', 'bias'):
+                old_key = f'{prefix}{old_name}.{param}'
+                if old_key in state_dict:
+                    value = state_dict.pop(old_key)
+                    if old_name == 'conv1' and param == 'weight':
+                        value = value.squeeze(-1)  # [out, in, 1] -> [out, in]
+                    state_dict[f'{prefix}{new_name}.{param}'] = value
 
     def forward(self, x):
         """
         Forward pass of the network.
 
         Args:
-            x (torch.Tensor): Input tensor of shape [batch_size, num_features, num_nodes].
+            x (torch.Tensor): Input tensor of shape [batch_size, num_nodes, num_features].
 
         Returns:
             torch.Tensor: Output probabilities of shape [batch_size, num_nodes].
         """
-        # Apply convolution
-        x = self.conv1(x)  # [batch_size, conv_out_channels, num_nodes]
-        x = F.relu(x)       # Apply ReLU activation
-
-        # Apply fully connected layer to each node's conv output
-        # Reshape to [batch_size * num_nodes, conv_out_channels]
-        batch_size, conv_out_channels, num_nodes = x.shape
-        x = x.permute(0, 2, 1).contiguous().view(batch_size * num_nodes, conv_out_channels)
-        scores = self.fc(x)  # [batch_size * num_nodes, 1]
-
-        # Reshape back to [batch_size, num_nodes]
-        scores = scores.view(batch_size, num_nodes)
+        scores = self.mlp(x).squeeze(-1)  # [batch_size, num_nodes]
 
         # Apply softmax to get probabilities
         probabilities = F.softmax(scores, dim=1)  # [batch_size, num_nodes]
 
         return probabilities
 
-def map_virtual_node(node_features, policy_net, virtual_node_cpu_requirement):
+def score_physical_nodes(features_batch, policy_net):
     """
-    Maps a virtual node to a physical node based on the policy network.
+    Computes physical node probabilities for a batch of feature matrices.
 
     Args:
-        node_features (List[dict]): List of node feature dictionaries.
+        features_batch (np.ndarray): Float32 features of shape [batch_size, num_nodes, num_features].
         policy_net (PolicyNetwork): The trained policy network.
-        virtual_node_cpu_requirement (float): CPU requirement of the virtual node.
 
     Returns:
-        Tuple[List[float], int]: A tuple containing the list of probabilities and the index of the selected physical node.
+        np.ndarray: Probabilities of shape [batch_size, num_nodes].
     """
-    # Prepare input tensor
-    # Extract features and convert to tensor
-    features = []
-    for feature in node_features:
-        features.append([
-            feature['CPU Resources'],
-            feature['Adjacent Bandwidth'],
-            feature['Distance Correlation'],
-            feature['Time Correlation'],
-            feature['Security']
-        ])
-    features_tensor = torch.tensor(features, dtype=torch.float)  # [num_nodes, num_features]
-
-    # Add batch dimension and permute to [batch_size, num_features, num_nodes]
-    input_tensor = features_tensor.unsqueeze(0).permute(0, 2, 1)  # [1, num_features, num_nodes]
+    # Wrap the features without copying them
+    input_tensor = torch.from_numpy(features_batch)  # [batch_size, num_nodes, num_features]
 
     # Forward pass through the policy network
-    with torch.no_grad():
-        probabilities_tensor = policy_net(input_tensor)  # [1, num_nodes]
+    with torch.inference_mode():
+        probabilities_tensor = policy_net(input_tensor)  # [batch_size, num_nodes]
+
+    return probabilities_tensor.numpy()
 
-    # Convert probabilities to list without using numpy
-    probabilities = probabilities_tensor[0].tolist()  # [num_nodes]
+def map_virtual_node(node_features, policy_net, virtual_node_cpu_requirement, probabilities=None, rng=None,
+                     verbose=False):
+    """
+    Maps a virtual node to a physical node based on the policy network.
+
+    Args:
+        node_features (np.ndarray): Float32 node features matrix of shape [num_nodes, num_features].
+        policy_net (PolicyNetwork): The trained policy network.
+        virtual_node_cpu_requirement (float): CPU requirement of the virtual node.
+        probabilities (np.ndarray, optional): Probabilities already computed for this virtual node,
+            e.g. by a batched call to score_physical_nodes. Defaults to None, which runs the
+            policy network on node_features.
+        rng (np.random.Generator, optional): Random generator used for sampling. Defaults to a
+            module-level generator.
+        verbose (bool, optional): Whether to print the probabilities of all physical nodes. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, int]: A tuple containing the probabilities and the index of the selected physical node.
+    """
+    if probabilities is None:
+        probabilities = score_physical_nodes(node_features[None], policy_net)[0]  # [num_nodes]
+    if rng is None:
+        rng = _rng
 
     # Print the probabilities
-    print("Probabilities of all physical nodes:")
-    for idx, prob in enumerate(probabilities):
-        print(f"node_{idx}: {prob:.4f}")
+    if verbose:
+        print("Probabilities of all physical nodes:")
+        for idx, prob in enumerate(probabilities.tolist()):
+            print(f"node_{idx}: {prob:.4f}")
 
     # Filter out nodes that cannot satisfy the CPU requirement
-    eligible_nodes = []
-    eligible_probs = []
-    for idx, feature in enumerate(node_features):
-        if feature['CPU Resources'] >= virtual_node_cpu_requirement:
-            eligible_nodes.append(idx)
-            eligible_probs.append(probabilities[idx])
-
-    if not eligible_nodes:
-        raise ValueError("No eligible physical nodes available for mapping the virtual node.")
+    eligible_nodes = np.flatnonzero(node_features[:, 0] >= virtual_node_cpu_requirement)
 
-    # Normalize the eligible probabilities
-    total_prob = sum(eligible_probs)
-    normalized_probs = [prob / total_prob for prob in eligible_probs]
+    if eligible_nodes.size == 0:
+        raise ValueError("No eligible physical nodes available for mapping the virtual node.")
 
-    # Select a node based on the probabilities
-    selected_node = random.choices(eligible_nodes, weights=normalized_probs, k=1)[0]
+    # Select a node by inverse-CDF sampling over the normalized eligible probabilities
+    cumulative_probs = np.cumsum(probabilities[eligible_nodes], dtype=np.float64)
+    selected_local = np.searchsorted(cumulative_probs, rng.random() * cumulative_probs[-1], side='right')
+    selected_node = int(eligible_nodes[min(selected_local, eligible_nodes.size - 1)])
 
     return probabilities, selected_node